@@ -4,35 +4,83 @@ separate zip files by date for archiving by date.
 """
 
 import argparse
-import glob
+import contextlib
+import itertools
 import logging
 import os
+import queue
+import re
 import shutil
 import sys
 import tempfile
+import threading
 import time
 import zipfile
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from functools import lru_cache
 from typing import (
+    IO,
+    Dict,
+    Iterator,
     List,
-    Optional
+    Optional,
+    Set,
+    Tuple,
+    Union
 )
 
+try:
+    # zlib-ng is an optional, faster drop-in replacement for the zlib module zipfile uses for Deflate and CRC-32
+    from zlib_ng import zlib_ng
+    zipfile.zlib = zlib_ng
+    zipfile.crc32 = zlib_ng.crc32
+except ImportError:
+    pass
+
 logger = logging.getLogger(__name__)
-logger.addHandler(logging.StreamHandler())
+# only add the handler once (e.g. if the module is reloaded), and don't pass records on to the root logger as well
+if not logger.handlers:
+    logger.addHandler(logging.StreamHandler())
+logger.propagate = False
 logger.setLevel(level=logging.INFO)
 
+# the buffer size to use when reading, writing and copying file data
+_BUFFER_SIZE = 1 << 20
+
+# the extensions of already compressed files, which are stored in the zip files without compressing them again
+_INCOMPRESSIBLE_EXTENSIONS = frozenset({
+    '.png', '.jpg', '.jpeg', '.webp', '.gif', '.mp4', '.zip', '.gz', '.xz', '.7z', '.bz2'
+})
+
+# the most member data (in bytes) to hold in memory between reading and zipping them, per zipping worker
+_MEMBER_QUEUE_BYTES = 16 << 20
+
+# members larger than this are streamed from the input zip file to the output zip file rather than held in memory
+_STREAM_MEMBER_SIZE = 4 << 20
+
+# a member put on the queue between reading and zipping: its (archive info, data or open member file to stream),
+# the exception if reading failed, or None once all the members have been read
+_QueuedMember = Union[Tuple[zipfile.ZipInfo, Union[bytes, IO[bytes]]], Exception, None]
+
+# the most worker processes ProcessPoolExecutor allows on Windows (it raises a ValueError for more)
+_MAX_WINDOWS_WORKERS = 61
+
+# the folders make_folder has already made (or found), so it doesn't have to check for them again
+_KNOWN_FOLDERS: Set[str] = set()
+
 
 def make_folder(folder_path: str) -> None:
     """ Make a folder if it doesn't exist
     :param folder_path: The path to the folder to make
     :return: None
     """
-    if not os.path.exists(folder_path):
-        logger.debug(f"Creating folder: {folder_path}")
-        os.makedirs(folder_path)
-    else:
-        logger.debug(f"Folder already exists: {folder_path} (skipping)")
+    if folder_path in _KNOWN_FOLDERS:
+        return
+    logger.debug("Making folder (if it doesn't exist): %s", folder_path)
+    os.makedirs(folder_path, exist_ok=True)
+    _KNOWN_FOLDERS.add(folder_path)
 
 
 def get_temp_folder(folder_path: Optional[str] = None) -> tempfile.TemporaryDirectory:
@@ -43,15 +91,130 @@ def get_temp_folder(folder_path: Optional[str] = None) -> tempfile.TemporaryDire
 
     if folder_path is None:
         temp_dir = tempfile.TemporaryDirectory()
-        logger.debug(f"Create new Temporary folder at: {temp_dir.name}")
+        logger.debug("Create new Temporary folder at: %s", temp_dir.name)
     else:
-        logger.debug(f"User provided Temporary storage Folder at: {folder_path}")
+        logger.debug("User provided Temporary storage Folder at: %s", folder_path)
         # make sure the temp folder exists
         make_folder(folder_path)
         temp_dir = tempfile.TemporaryDirectory(dir=folder_path)
     return temp_dir
 
 
+@lru_cache(maxsize=None)
+def _date_time_to_timestamp(date_time: Tuple[int, int, int, int, int, int]) -> float:
+    """ Convert a zip file member's date time to a local timestamp
+    (cached, since the members of a zip file often share the same date times)
+    :param date_time: The date time tuple of the zip file member
+    :return: The timestamp
+    """
+    try:
+        return datetime(*date_time).timestamp()
+    except ValueError:
+        # out of range date times (e.g. the all zero date some zip tools write) are left for mktime to normalize
+        # Note the -1 at the end of the tuple is used to handle daylight savings time (DST) for auto-adjusting
+        return time.mktime(date_time + (0, 0, -1))
+
+
+@lru_cache(maxsize=None)
+def _date_time_to_date_key(date_time: Tuple[int, int, int, int, int, int]) -> Tuple[int, int, int]:
+    """ Get the (year, month, day) date key for a zip file member's date time
+    :param date_time: The date time tuple of the zip file member
+    :return: The date key
+    """
+    try:
+        datetime(*date_time)
+    except ValueError:
+        # use the date of the normalized timestamp, as the file would have when unzipped
+        return time.localtime(_date_time_to_timestamp(date_time))[:3]
+    return date_time[:3]
+
+
+def _date_key_to_folder_name(date_key: Tuple[int, int, int]) -> str:
+    """ Get the sorted sub folder name for a date key
+    :param date_key: The (year, month, day) date key
+    :return: The sub folder name
+    """
+    return "%04d_%02d_%02d" % date_key
+
+
+def _folder_name_to_date_key(folder_name: str) -> Tuple[int, int, int]:
+    """ Get the date key back from a sorted sub folder name
+    :param folder_name: The sub folder name
+    :return: The (year, month, day) date key
+    """
+    year, month, day = map(int, folder_name.split('_'))
+    return year, month, day
+
+
+def _format_date_key(date_key: Tuple[int, int, int], date_format: str) -> str:
+    """ Format a date key with a date format for a zip file name
+    :param date_key: The (year, month, day) date key
+    :param date_format: The date format to use
+    :return: The formatted date
+    """
+    if date_format == "%Y-%m-%d":
+        # the default format is just the date key's numbers, so skip the datetime round trip
+        return "%04d-%02d-%02d" % date_key
+    return datetime(*date_key).strftime(date_format)
+
+
+def _member_group_key(member_name: str) -> Tuple[str, ...]:
+    """ Get a key that is the same for all the member names in a zip file that could unzip to the same path
+    (it ignores case and the path parts zipfile's extract drops or replaces, so it may group more names than
+    actually collide on a given file system, but never fewer)
+    :param member_name: The name of the member in the zip file
+    :return: The group key
+    """
+    return tuple(
+        re.sub(r'[:<>|"?*]', '_', part).rstrip('. ').lower()
+        for part in re.split(r'[\\/]', member_name)
+        if part not in ('', os.path.curdir, os.path.pardir)
+    )
+
+
+def _worker_count(task_count: int) -> int:
+    """ Get the number of worker processes to use for a number of tasks
+    :param task_count: The number of tasks to run in the worker processes
+    :return: The number of worker processes
+    """
+    worker_count = min(task_count, os.cpu_count() or 1)
+    if sys.platform == 'win32':
+        worker_count = min(worker_count, _MAX_WINDOWS_WORKERS)
+    return worker_count
+
+
+def _extract_members(members: List[Tuple[str, zipfile.ZipInfo]], unzip_folder: str) -> None:
+    """ Unzip members of the zip files, each into its zip file's own sub folder of the unzip folder
+    (run in a worker process)
+    :param members: The list of (zip file, member info) pairs to unzip
+    :param unzip_folder: The folder to unzip the members into
+    :return: None
+    """
+
+    zip_refs: Dict[str, zipfile.ZipFile] = {}
+    with contextlib.ExitStack() as zip_stack:
+        for zip_file, unzip_file in members:
+            if zip_file not in zip_refs:
+                zip_raw = zip_stack.enter_context(open(zip_file, 'rb', buffering=_BUFFER_SIZE))
+                # Note: the other workers read the same zip file, so its data is left cached for them
+                _advise_file(zip_raw, 'POSIX_FADV_SEQUENTIAL')
+                zip_refs[zip_file] = zip_stack.enter_context(zipfile.ZipFile(zip_raw, 'r'))
+            zip_ref = zip_refs[zip_file]
+
+            # each zip file gets its own sub folder so members with the same name in different zip files don't
+            # collide while unzipping (they still meet once sorted, see sort_files_by_date)
+            zip_unzip_folder = os.path.join(unzip_folder, os.path.basename(zip_file))
+            # Note: extract makes the member's name safe (so it can't land outside the folder) and returns its path
+            try:
+                unzip_file_path = zip_ref.extract(unzip_file, zip_unzip_folder)
+            except FileExistsError:
+                # another worker made the member's folder between extract checking for it and making it
+                unzip_file_path = zip_ref.extract(unzip_file, zip_unzip_folder)
+            unzip_file_modified_timestamp = _date_time_to_timestamp(unzip_file.date_time)
+            # set the access and modified time of the unzipped file to match the zip file
+            os.utime(unzip_file_path, (unzip_file_modified_timestamp, unzip_file_modified_timestamp))
+
+
 def unzip_all_zip_files(input_folder: str, unzip_folder: str) -> None:
     """ Unzip all zip files in a folder
     :param input_folder: The folder containing the zip files
@@ -62,23 +225,106 @@ def unzip_all_zip_files(input_folder: str, unzip_folder: str) -> None:
     # Make sure the unzip folder exists
     make_folder(unzip_folder)
 
-    # use glob to get a list of all the zip files in the input folder
-    zip_files = glob.glob(f"{input_folder}/*.zip")
+    zip_files = _list_zip_files(input_folder)
 
-    # loop thru each zip file
+    # group the members that would unzip to the same path, so each group is unzipped by one worker in order and
+    # the last member still wins (as with extractall), rather than several workers writing the same file at once
+    member_groups: Dict[Tuple[str, Tuple[str, ...]], List[Tuple[str, zipfile.ZipInfo]]] = defaultdict(list)
     for zip_file in zip_files:
-        # Unzip the file into the unzip folder
         with zipfile.ZipFile(zip_file, 'r') as zip_ref:
-            zip_ref.extractall(unzip_folder)
-            logger.info(f"Unzipped: {zip_file}")
             for unzip_file in zip_ref.infolist():
-                logger.debug(f"Setting modified time for: {unzip_file.filename}")
-                unzip_file_path = os.path.join(unzip_folder, unzip_file.filename)
-                unzip_file_modified_datetime = unzip_file.date_time
-                # Note the -1 at the end of the tuple is used to handle daylight savings time (DST) for auto-adjusting
-                unzip_file_modified_timestamp = time.mktime(unzip_file_modified_datetime + (0, 0, -1))
-                # set the access and modified time of the unzipped file to match the zip file
-                os.utime(unzip_file_path, (unzip_file_modified_timestamp, unzip_file_modified_timestamp))
+                if not unzip_file.is_dir():
+                    member_groups[(zip_file, _member_group_key(unzip_file.filename))].append((zip_file, unzip_file))
+    if len(member_groups) == 0:
+        return
+
+    # unzip the members in parallel (decompression is CPU bound, so use processes rather than threads),
+    # dealing the groups out round robin so one large zip file doesn't leave a single worker unzipping it alone
+    groups = list(member_groups.values())
+    worker_count = _worker_count(len(groups))
+    member_shards = [
+        [member for group in groups[worker_index::worker_count] for member in group]
+        for worker_index in range(worker_count)
+    ]
+    # Note: logging is done here in the parent process since worker processes don't share its log level
+    with ProcessPoolExecutor(max_workers=worker_count) as executor:
+        for member_shard, _ in zip(
+                member_shards,
+                executor.map(_extract_members, member_shards, itertools.repeat(unzip_folder))
+        ):
+            if logger.isEnabledFor(logging.DEBUG):
+                for zip_file, unzip_file in member_shard:
+                    logger.debug("Unzipped %s from %s and set its modified time", unzip_file.filename, zip_file)
+    for zip_file in zip_files:
+        logger.info(f"Unzipped: {zip_file}")
+
+
+def _advise_file(file: IO, advice: str) -> None:
+    """ Hint to the OS how a file's data will be used, where the OS supports it (e.g. not on Windows)
+    :param file: The open file
+    :param advice: The name of the os.POSIX_FADV_* advice to give
+    :return: None
+    """
+    if not hasattr(os, 'posix_fadvise'):
+        return
+    try:
+        os.posix_fadvise(file.fileno(), 0, 0, getattr(os, advice))
+    except OSError as error:
+        # it is only a hint, so carry on without it
+        logger.debug("Unable to advise %s for %s: %s", advice, file.name, error)
+
+
+@contextlib.contextmanager
+def _open_zip_file_for_writing(zip_archive_path: str) -> Iterator[IO[bytes]]:
+    """ Open a zip file for writing under a temporary name, which is renamed to the zip file's name once it has been
+    written, or removed if writing it fails (so a broken zip file is never left looking like a finished one)
+    :param zip_archive_path: The path to the zip file to write
+    :return: A context manager for the open (buffered) file
+    """
+    temp_archive_path = f"{zip_archive_path}.part"
+    try:
+        with open(temp_archive_path, 'wb', buffering=_BUFFER_SIZE) as zip_raw:
+            yield zip_raw
+        os.replace(temp_archive_path, zip_archive_path)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(temp_archive_path)
+        raise
+
+
+def _compress_type(file_name: str) -> int:
+    """ Get the zip compression type to use for a file
+    :param file_name: The name of the file
+    :return: ZIP_STORED for already compressed files, otherwise ZIP_DEFLATED
+    """
+    if os.path.splitext(file_name)[1].lower() in _INCOMPRESSIBLE_EXTENSIONS:
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+def _list_zip_files(folder_path: str) -> List[str]:
+    """ List the zip files in a folder
+    :param folder_path: The path to the folder
+    :return: The sorted list of paths to the zip files in the folder
+    """
+    with os.scandir(folder_path) as entries:
+        return sorted(
+            entry.path for entry in entries
+            if entry.is_file() and os.path.splitext(entry.name)[1].lower() == '.zip'
+        )
+
+
+def _scan_files(folder_path: str) -> Iterator[os.DirEntry]:
+    """ Recursively scan a folder for files
+    :param folder_path: The path to the folder to scan
+    :return: An iterator of the directory entries for the files in the folder and its sub folders
+    """
+    with os.scandir(folder_path) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from _scan_files(entry.path)
+            elif entry.is_file(follow_symlinks=False):
+                yield entry
 
 
 def sort_files_by_date(unzip_folder: str, sorted_folder: str) -> None:
@@ -91,26 +337,81 @@ def sort_files_by_date(unzip_folder: str, sorted_folder: str) -> None:
     # Make sure the sorted folder exists
     make_folder(sorted_folder)
 
-    # use glob to get a list of all the zip files in the input folder
-    files = glob.glob(f"{unzip_folder}/*.*")
+    # scan the unzip folder recursively, since each zip file is unzipped into its own sub folder
+    # Note: the scan is finished before any files are moved, so the moves don't upset it
+    # Note: files with the same name and date from different zip files are moved to the same path, so they are
+    # moved in zip file order (as the sub folders are named after them), and the later zip file's file wins
+    # (as with zip_files_by_date)
+    entries = sorted(
+        _scan_files(unzip_folder),
+        key=lambda entry: os.path.relpath(entry.path, unzip_folder).split(os.path.sep)
+    )
 
-    for file in files:
-        file_name = os.path.basename(file)
-        # Get the last modified date of the file
-        modified_time = os.path.getmtime(file)
-        modified_date = datetime.fromtimestamp(modified_time)
+    # files can be renamed straight into place when both folders are on the same device,
+    # otherwise fall back to shutil.move (which copies them across)
+    if os.stat(unzip_folder).st_dev == os.stat(sorted_folder).st_dev:
+        move_file = os.replace
+    else:
+        move_file = shutil.move
 
-        # Create a sub folder with the date format in the sorted folder
-        date_folder = modified_date.strftime("%m_%d_%Y")
-        date_folder_path = os.path.join(sorted_folder, date_folder)
+    # group the files by the date in their modified time
+    date_files: Dict[Tuple[int, int, int], List[os.DirEntry]] = defaultdict(list)
+    for entry in entries:
+        date_key = time.localtime(entry.stat(follow_symlinks=False).st_mtime)[:3]
+        date_files[date_key].append(entry)
 
+    for date_key, date_entries in date_files.items():
+        # Create the date sub folder once for all of its files
+        date_folder_path = os.path.join(sorted_folder, _date_key_to_folder_name(date_key))
         make_folder(date_folder_path)
-        # get filename from path
 
-        move_path = os.path.join(date_folder_path, file_name)
-        # Move the file to the corresponding date sub folder
-        shutil.move(file, move_path)
-        logger.debug(f"Moved: {file} to {move_path}")
+        for entry in date_entries:
+            file = entry.path
+            move_path = os.path.join(date_folder_path, entry.name)
+            # Move the file to the corresponding date sub folder
+            move_file(file, move_path)
+            logger.debug("Moved: %s to %s", file, move_path)
+
+
+def _archive_paths(output_folder: str, archive_name_format: str, date_file_counts: Dict[str, int]) -> List[str]:
+    """ Get the zip file path for each formatted date, making sure no two dates share a zip file
+    (the zip files are written in parallel, so a shared zip file would have several writers at once)
+    :param output_folder: The folder to output the zip files to
+    :param archive_name_format: The format for the zip file name (as a format string)
+    :param date_file_counts: The number of files for each formatted date
+    :return: The list of zip file paths, in the same order as the formatted dates
+    """
+    zip_archive_paths = []
+    archive_dates: Dict[str, str] = {}
+    for date_folder_format, file_count in date_file_counts.items():
+        archive_name = archive_name_format.format(
+            date_format=date_folder_format,
+            file_count=file_count
+        )
+        zip_archive_path = os.path.join(output_folder, archive_name)
+        # Note: normcase since file names that only differ by case are the same file on Windows
+        other_date_folder_format = archive_dates.setdefault(os.path.normcase(zip_archive_path), date_folder_format)
+        if other_date_folder_format != date_folder_format:
+            raise ValueError(
+                f"The dates {other_date_folder_format} and {date_folder_format} would both be zipped to "
+                f"{zip_archive_path}, the zip file name format must include the date: {archive_name_format}"
+            )
+        zip_archive_paths.append(zip_archive_path)
+    return zip_archive_paths
+
+
+def _zip_one(zip_archive_path: str, sorted_files: List[str]) -> None:
+    """ Zip sorted files into a single archive file (run in a worker process)
+    :param zip_archive_path: The path to the zip file to create
+    :param sorted_files: The list of sorted files to add to the zip file
+    :return: None
+    """
+
+    # Create a zip file for the sorted files
+    with _open_zip_file_for_writing(zip_archive_path) as zip_raw, \
+            zipfile.ZipFile(zip_raw, 'w', zipfile.ZIP_DEFLATED) as zipf:
+        for file in sorted_files:
+            zipf.write(file, os.path.basename(file), compress_type=_compress_type(file))
 
 
 def zip_sorted_folders(
@@ -127,38 +428,249 @@ def zip_sorted_folders(
     :return: None
     """
 
-    sorted_folders = [
-        os.path.join(sorted_folder, d)
-        for d in os.listdir(sorted_folder) if os.path.isdir(os.path.join(sorted_folder, d))
-    ]
-
-    for sorted_folder in sorted_folders:
-        logger.info(f"Zipping sorted files in {sorted_folder} to {output_folder}")
-        sorted_files = glob.glob(f"{sorted_folder}/*.*")
-        sorted_file_count = len(sorted_files)
-        if sorted_file_count == 0:
-            logger.info(f"Skipping sort folder {sorted_folder} because it is empty")
+    with os.scandir(sorted_folder) as entries:
+        date_folders = sorted(entry.path for entry in entries if entry.is_dir())
+
+    # group the sorted files by the zip file they go in, which is named by the date of their sub folder
+    # (a date format that leaves out the day, e.g. %Y-%m for monthly zip files, puts several sub folders in one)
+    # Note: the sub folders are taken in date order, so a later date's file with the same name replaces an earlier one
+    date_files: Dict[str, Dict[str, str]] = defaultdict(dict)
+    for date_folder in date_folders:
+        with os.scandir(date_folder) as entries:
+            sorted_files = [entry.path for entry in entries if entry.is_file()]
+        if len(sorted_files) == 0:
+            logger.info(f"Skipping sort folder {date_folder} because it is empty")
             continue
+        # Get the date from the sub folder name, and encode it to a string in the format we want for the zip file name
+        date_key = _folder_name_to_date_key(os.path.basename(date_folder))
+        date_folder_format = _format_date_key(date_key, date_format)
+        for file in sorted_files:
+            date_files[date_folder_format][os.path.basename(file)] = file
+    if len(date_files) == 0:
+        return
+
+    zip_archive_paths = _archive_paths(
+        output_folder,
+        archive_name_format,
+        {date_folder_format: len(files) for date_folder_format, files in date_files.items()}
+    )
 
-        # Get the date from the sub folder name
-        sorted_folder_name = os.path.basename(sorted_folder)
-        # decode the date from the sub folder name
-        folder_decoded_date = datetime.strptime(sorted_folder_name, "%m_%d_%Y")
-        # encode the date to a string in the format we want for the zip file name
-        date_folder_format = folder_decoded_date.strftime(date_format)
+    # zip each date in parallel (compression is CPU bound, so use processes rather than threads)
+    # Note: logging is done here in the parent process since worker processes don't share its log level
+    with ProcessPoolExecutor(max_workers=_worker_count(len(date_files))) as executor:
+        file_lists = [list(files.values()) for files in date_files.values()]
+        for zip_archive_path, file_list, _ in zip(
+                zip_archive_paths,
+                file_lists,
+                executor.map(_zip_one, zip_archive_paths, file_lists)
+        ):
+            logger.info(f"Zipped {len(file_list)} sorted files to {zip_archive_path}")
+            if logger.isEnabledFor(logging.DEBUG):
+                for file in file_list:
+                    logger.debug("Added %s to %s", file, zip_archive_path)
+
+
+class _MemberBudget:
+    """ A limit on the bytes of member data held in memory between reading and zipping them """
+
+    def __init__(self, size: int) -> None:
+        """ Create a member budget
+        :param size: The most member data (in bytes) to hold at once
+        :return: None
+        """
+        self._size = size
+        self._used = 0
+        self._closed = False
+        self._condition = threading.Condition()
+
+    def acquire(self, size: int) -> None:
+        """ Wait until there is room in the budget for more member data, and take it
+        (once closed, this no longer waits)
+        :param size: The size of the member data
+        :return: None
+        """
+        with self._condition:
+            # Note: nothing held means there is always room, so a member larger than the budget can't block forever
+            while self._used and self._used + size > self._size and not self._closed:
+                self._condition.wait()
+            self._used += size
+
+    def release(self, size: int) -> None:
+        """ Give back room in the budget once member data has been zipped
+        :param size: The size of the member data
+        :return: None
+        """
+        with self._condition:
+            self._used -= size
+            self._condition.notify_all()
+
+    def close(self) -> None:
+        """ Stop waiting for room in the budget (e.g. once zipping has stopped early)
+        :return: None
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+
+def _read_members(
+        members: List[Tuple[str, zipfile.ZipInfo]],
+        member_queue: "queue.Queue[_QueuedMember]",
+        member_budget: _MemberBudget,
+        member_streamed: threading.Event,
+        stop_reading: threading.Event
+) -> None:
+    """ Read members of the input zip files onto a queue for zipping (run in a reader thread)
+    :param members: The list of (input zip file, member info) pairs to read
+    :param member_queue: The queue to put the read members on
+    :param member_budget: The budget for the member data held on the queue
+    :param member_streamed: An event that is set once a streamed member has been zipped
+    :param stop_reading: An event that is set if the members are no longer wanted
+    :return: None
+    """
 
-        archive_name = archive_name_format.format(
-            date_format=date_folder_format,
-            file_count=sorted_file_count
-        )
+    zip_refs: Dict[str, zipfile.ZipFile] = {}
+    try:
+        with contextlib.ExitStack() as zip_stack:
+            for zip_file, member_info in members:
+                if stop_reading.is_set():
+                    break
+                if zip_file not in zip_refs:
+                    zip_raw = zip_stack.enter_context(open(zip_file, 'rb', buffering=_BUFFER_SIZE))
+                    # Note: the other date workers read the same zip file, so its data is left cached for them
+                    _advise_file(zip_raw, 'POSIX_FADV_SEQUENTIAL')
+                    zip_refs[zip_file] = zip_stack.enter_context(zipfile.ZipFile(zip_raw, 'r'))
+                zip_ref = zip_refs[zip_file]
+                # keep the member's modified time and attributes, but drop any folders from its name
+                archive_info = zipfile.ZipInfo(os.path.basename(member_info.filename), member_info.date_time)
+                archive_info.compress_type = _compress_type(member_info.filename)
+                # the attributes only mean something alongside the system that made them (e.g. DOS vs Unix)
+                archive_info.create_system = member_info.create_system
+                archive_info.external_attr = member_info.external_attr
+                if member_info.file_size <= _STREAM_MEMBER_SIZE:
+                    data = zip_ref.read(member_info)
+                    member_budget.acquire(len(data))
+                    member_queue.put((archive_info, data))
+                    continue
+                # hand large members over as an open file to stream from, and wait until they have been zipped
+                # before reading on (the file size lets the output zip file decide if it needs ZIP64)
+                archive_info.file_size = member_info.file_size
+                with zip_ref.open(member_info) as member_file:
+                    member_streamed.clear()
+                    # zipping may have stopped (and set member_streamed) before the clear, in which case nothing
+                    # would set it again, but it sets stop_reading first, so check that again
+                    if stop_reading.is_set():
+                        break
+                    member_queue.put((archive_info, member_file))
+                    member_streamed.wait()
+        member_queue.put(None)
+    except Exception as error:
+        member_queue.put(error)
+
+
+def _route_one(zip_archive_path: str, members: List[Tuple[str, zipfile.ZipInfo]]) -> None:
+    """ Zip members of the input zip files straight into a single archive file (run in a worker process)
+    :param zip_archive_path: The path to the zip file to create
+    :param members: The list of (input zip file, member info) pairs to add to the zip file
+    :return: None
+    """
 
-        zip_archive_path = os.path.join(output_folder, archive_name)
-        # Create a zip file for each sub folder
-        with zipfile.ZipFile(zip_archive_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for file in sorted_files:
-                relative_archive_name = os.path.relpath(file, sorted_folder)
-                zipf.write(file, relative_archive_name)
-                logger.debug(f"Added {file} to {zip_archive_path}")
+    # read (decompress) the members in a separate thread so it overlaps with zipping (compressing) them here,
+    # with a budget on the member data queued between the two to limit how much is held in memory
+    member_queue: "queue.Queue[_QueuedMember]" = queue.Queue()
+    member_budget = _MemberBudget(_MEMBER_QUEUE_BYTES)
+    member_streamed = threading.Event()
+    stop_reading = threading.Event()
+    reader = threading.Thread(
+        target=_read_members,
+        args=(members, member_queue, member_budget, member_streamed, stop_reading),
+        daemon=True
+    )
+    reader.start()
+    try:
+        with _open_zip_file_for_writing(zip_archive_path) as zip_raw, \
+                zipfile.ZipFile(zip_raw, 'w', zipfile.ZIP_DEFLATED) as zipf:
+            while True:
+                member = member_queue.get()
+                if member is None:
+                    break
+                if isinstance(member, Exception):
+                    raise member
+                archive_info, data = member
+                if isinstance(data, bytes):
+                    zipf.writestr(archive_info, data)
+                    member_budget.release(len(data))
+                    continue
+                with zipf.open(archive_info, 'w') as archive_file:
+                    shutil.copyfileobj(data, archive_file, _BUFFER_SIZE)
+                member_streamed.set()
+    finally:
+        # make sure the reader isn't left waiting on the budget (or a streamed member) if zipping stopped early
+        # Note: stop_reading must be set before member_streamed, see _read_members
+        stop_reading.set()
+        member_budget.close()
+        member_streamed.set()
+        reader.join()
+
+
+def zip_files_by_date(
+        input_folder: str,
+        output_folder: str,
+        archive_name_format: str = "archive_{date_format}_[{file_count}].zip",
+        date_format: str = "%Y-%m-%d"
+) -> None:
+    """ Zip the members of all zip files in a folder straight into separate zip files by date
+    (this skips unzipping and sorting the files on disk)
+    :param input_folder: The folder containing the zip files
+    :param output_folder: The folder to output the zip files to
+    :param archive_name_format: The format for the zip file name (as a format string)
+    :param date_format: The date format to use for the zip file name
+    :return: None
+    """
+
+    zip_files = _list_zip_files(input_folder)
+
+    # group the members of each zip file by the zip file they go in, which is named by the date in their modified
+    # time (a date format that leaves out the day, e.g. %Y-%m for monthly zip files, puts several dates in one)
+    # Note: as when unzipping, a later member with the same file name (and zip file) replaces an earlier one
+    # Note: the member infos are kept and passed on, so the workers don't have to look the members up again
+    date_folder_formats: Dict[Tuple[int, int, int], str] = {}
+    date_members: Dict[str, Dict[str, Tuple[str, zipfile.ZipInfo]]] = defaultdict(dict)
+    for zip_file in zip_files:
+        with zipfile.ZipFile(zip_file, 'r') as zip_ref:
+            for member_info in zip_ref.infolist():
+                if member_info.is_dir():
+                    continue
+                date_key = _date_time_to_date_key(member_info.date_time)
+                date_folder_format = date_folder_formats.get(date_key)
+                if date_folder_format is None:
+                    date_folder_format = _format_date_key(date_key, date_format)
+                    date_folder_formats[date_key] = date_folder_format
+                file_name = os.path.basename(member_info.filename)
+                date_members[date_folder_format][file_name] = (zip_file, member_info)
+        logger.info(f"Read: {zip_file}")
+    if len(date_members) == 0:
+        return
+
+    zip_archive_paths = _archive_paths(
+        output_folder,
+        archive_name_format,
+        {date_folder_format: len(members) for date_folder_format, members in date_members.items()}
+    )
+
+    # zip each date in parallel (compression is CPU bound, so use processes rather than threads)
+    # Note: logging is done here in the parent process since worker processes don't share its log level
+    with ProcessPoolExecutor(max_workers=_worker_count(len(date_members))) as executor:
+        member_lists = [list(members.values()) for members in date_members.values()]
+        for zip_archive_path, member_list, _ in zip(
+                zip_archive_paths,
+                member_lists,
+                executor.map(_route_one, zip_archive_paths, member_lists)
+        ):
+            logger.info(f"Zipped {len(member_list)} files to {zip_archive_path}")
+            if logger.isEnabledFor(logging.DEBUG):
+                for zip_file, member_info in member_list:
+                    logger.debug("Added %s from %s to %s", member_info.filename, zip_file, zip_archive_path)
 
 
 def main(override_args: Optional[List[str]] = None) -> None:
@@ -189,16 +701,21 @@ def main(override_args: Optional[List[str]] = None) -> None:
         '-u',
         '--unzip',
         type=str,
-        help="temporary path to unzip the zip files into",
+        help="temporary path to unzip the zip files into (implies --staged)",
         default=None
     )
     parser.add_argument(
         '-s',
         '--sort',
         type=str,
-        help="temporary path to sort the zip files into",
+        help="temporary path to sort the zip files into (implies --staged)",
         default=None
     )
+    parser.add_argument(
+        '--staged',
+        action='store_true',
+        help="unzip and sort the files on disk (in the --unzip and --sort paths) before zipping them"
+    )
     parser.add_argument(
         '-f',
         '--format',
@@ -247,6 +764,20 @@ def main(override_args: Optional[List[str]] = None) -> None:
     # Make sure the output folder exists
     make_folder(args.output)
 
+    # the unzip and sort folders are only used when staging, so asking for either implies it
+    if not args.staged and (args.unzip is not None or args.sort is not None):
+        logger.info("Unzip or sort folder given, so staging the files on disk")
+        args.staged = True
+
+    if not args.staged:
+        logger.info("Zipping all zip files to archive files by date")
+        try:
+            zip_files_by_date(args.input, args.output, args.format, args.date)
+        except ValueError as error:
+            logger.error(error)
+            sys.exit(1)
+        return
+
     unzip_dir = get_temp_folder(args.unzip)
     sort_dir = get_temp_folder(args.sort)
 
@@ -256,7 +787,11 @@ def main(override_args: Optional[List[str]] = None) -> None:
     logger.info("Sorting unzipped files by date")
     sort_files_by_date(unzip_dir.name, sort_dir.name)
     logger.info("Zipping sorted folders to archive files")
-    zip_sorted_folders(sort_dir.name, args.output, args.format, args.date)
+    try:
+        zip_sorted_folders(sort_dir.name, args.output, args.format, args.date)
+    except ValueError as error:
+        logger.error(error)
+        sys.exit(1)
 
 
 if __name__ == "__main__":